@@ -15,7 +15,7 @@ The .ics file can be imported into:
     - Android Calendar apps
 
 Dependencies:
-    pip install ics
+    None: the .ics text is written directly (standard library only)
 
 INPUT: 
     - None
@@ -28,14 +28,18 @@ OUTPUT:
 # ------------------------------
 import csv                                  # STANDARD: Read CSV input files
 import os                                   # STANDARD: Path handling and file checks
-from ics import Calendar, Event             # THIRD-PARTY: Create .ics calendar files
-from datetime import datetime, timedelta    # STANDARD: Date/time arithmetic
+from datetime import datetime, timedelta, timezone  # STANDARD: Date/time arithmetic
+import uuid                                 # STANDARD: Unique identifier of each calendar event
 from zoneinfo import ZoneInfo               # STANDARD (Python ≥3.9): Timezone support
 import unicodedata                          # STANDARD: Unicode normalization (accents)
 import re                                   # STANDARD: Regular expressions (text cleanup)
+from collections import defaultdict, Counter  # STANDARD: Word index and shared-word counts
+from itertools import chain                 # STANDARD: Flatten word index lookups
+from functools import lru_cache             # STANDARD: Memoize pure helper functions
+from operator import itemgetter             # STANDARD: Pick CSV columns by position
 
 # customed functions
-from import_data import load_and_import_data    # Local module: fetch HTML
+from import_data import load_and_import_pages   # Local module: fetch HTML
 from extract_necessary_data import load_html    # Local module: parse HTML → CSV
 
 # ------------------------------
@@ -74,6 +78,23 @@ REFEREES_CSV = os.path.join(OUTPUT_DIR, "referees.csv")
 # Generated calendar file (.ics file)
 ICS_FILE = os.path.join(OUTPUT_DIR, "matches_calendar.ics")
 
+# iCalendar (.ics) text: header/footer of the file and template of one event (RFC 5545)
+ICS_HEADER = "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//basketball_calendar//FR\r\n"
+ICS_FOOTER = "END:VCALENDAR\r\n"
+VEVENT_TEMPLATE = (
+    "BEGIN:VEVENT\r\n"
+    "UID:{uid}\r\n"
+    "DTSTAMP:{stamp}\r\n"
+    "DTSTART:{start}\r\n"
+    "DTEND:{end}\r\n"
+    "SUMMARY:{summary}\r\n"
+    "LOCATION:{location}\r\n"
+    "DESCRIPTION:{description}\r\n"
+    "END:VEVENT\r\n"
+)
+ICS_DATETIME_FORMAT = "%Y%m%dT%H%M%SZ" # UTC date-time
+ICS_ESCAPE_MAP = str.maketrans({"\\": "\\\\", ";": "\\;", ",": "\\,", "\n": "\\n", "\r": "\\r"}) # special characters in text values
+
 # Mappings of columns to be retrieved
 COLUMN_MAP_ASSIGNATIONS = {
     '#': 0,
@@ -123,20 +144,51 @@ SPECIAL_CASES = [
     (r"\bL\.-?J\.?\.?\s*Casault\b", "Louis-Jacques Casault"),
 ]
 
+# Columns of the matches file used to build the calendar, in the order load_matches() returns them
+MATCH_COLUMNS = ("Ligue", "Calibre", "Jour", "Date", "Heure", "Equipes", "Terrain", "Autre arbitre")
+
+# Date/time formats used by browsers or exported HTML pages, most common first.
+# Keyed by (first separator, year first?) so the right one can be picked without trial and error.
+DATETIME_FORMATS = {
+    ("-", True): "%Y-%m-%d %H:%M",
+    ("/", False): "%d/%m/%Y %H:%M",
+    ("-", False): "%d-%m-%Y %H:%M",
+    ("/", True): "%Y/%m/%d %H:%M",
+    (".", False): "%d.%m.%Y %H:%M",
+}
+
+# Accented letters used in French names → same letter without accent
+# (same result as removing the accents after Unicode decomposition, but done in one pass)
+ACCENT_MAP = str.maketrans(
+    "àâäáãéèêëíìîïóòôöõúùûüýÿçñÀÂÄÁÃÉÈÊËÍÌÎÏÓÒÔÖÕÚÙÛÜÝŸÇÑ",
+    "aaaaaeeeeiiiiooooouuuuyycnAAAAAEEEEIIIIOOOOOUUUUYYCN",
+)
+
+# Compiled once at import: normalize() runs for every terrain/school comparison.
+# Each rule set is fused into one alternation (named group g<i> <-> rule i) so the text
+# is scanned once instead of once per rule; names, not group numbers, identify the rule,
+# so a rule may contain groups of its own.
+_ABBREV_RE = re.compile("|".join(f"(?P<g{i}>{p})" for i, p in enumerate(ABBREVIATIONS)), re.IGNORECASE)
+_ABBREV_REPLACEMENTS = list(ABBREVIATIONS.values())
+_SPECIAL_RE = re.compile("|".join(f"(?P<g{i}>{p})" for i, (p, _) in enumerate(SPECIAL_CASES)), re.IGNORECASE)
+_SPECIAL_REPLACEMENTS = [r for _, r in SPECIAL_CASES]
+_PAREN_RE = re.compile(r"\(.*?\)")   # parentheses and their content
+_PUNCT_RE = re.compile(r"[^\w\s]")   # punctuation
+_WS_RE = re.compile(r"\s+")          # runs of whitespace
+
 # ------------------------------
 # Functions
 # -----------------------------
 def expand_abbreviations(text):
     """Replace known abbreviations with full words."""
-    result = text
-    for pattern, replacement in ABBREVIATIONS.items():
-        result = re.sub(pattern, replacement, result, flags=re.IGNORECASE)
-    return result
+    return _ABBREV_RE.sub(lambda m: _ABBREV_REPLACEMENTS[int(m.lastgroup[1:])], text)
 
 
 
+@lru_cache(maxsize=None)
 def normalize(text):
-    """Normalize for comparison: expand abbreviations, remove accents, punctuation, lowercase."""
+    """Normalize for comparison: expand abbreviations, remove accents, punctuation, lowercase.
+    Results are cached: the same school names and terrains are normalized over and over."""
     if not text:
         return ""
     # expand known abbreviations first
@@ -144,22 +196,24 @@ def normalize(text):
     text = expand_abbreviations(text)
     # print(f"TEXT after abbreviation................text = {text}")
     # apply special-case rules
-    for pattern, replacement in SPECIAL_CASES:
-        text = re.sub(pattern, replacement, text, flags=re.IGNORECASE)
+    text = _SPECIAL_RE.sub(lambda m: _SPECIAL_REPLACEMENTS[int(m.lastgroup[1:])], text)
     # remove accents
-    text = ''.join(
-        c for c in unicodedata.normalize('NFD', text)
-        if unicodedata.category(c) != 'Mn'
-    )
+    text = text.translate(ACCENT_MAP)
+    if not text.isascii():
+        # accents missing from ACCENT_MAP (or already decomposed): decompose and drop the combining marks
+        text = ''.join(
+            c for c in unicodedata.normalize('NFD', text)
+            if unicodedata.category(c) != 'Mn'
+        )
     # lowercase
     text = text.lower()
     # remove parentheses and content in parentheses
-    text = re.sub(r"\(.*?\)", "", text)
+    text = _PAREN_RE.sub("", text)
     # remove punctuation
-    text = re.sub(r"[^\w\s]", " ", text)
+    text = _PUNCT_RE.sub(" ", text)
     # collapse spaces
     # print(f"BEFORE STRIP................text normalized = {text}")
-    text = re.sub(r"\s+", " ", text).strip()
+    text = _WS_RE.sub(" ", text).strip()
     # print(f"AFTER STRIP................text normalized = {text}")
     # remove any spaces within text
     # text = text.replace(" ", "")
@@ -168,6 +222,24 @@ def normalize(text):
 
 
 
+def read_csv_columns(file_path, columns):
+    """
+    Yield one tuple per data row of a CSV file with the values of the given columns (by header name),
+    in the order of columns. Rows are read as plain lists: no dict is built per row.
+    """
+    with open(file_path, newline="", encoding="utf-8") as csvfile:
+        reader = csv.reader(csvfile)
+        header = next(reader, [])
+        pick = itemgetter(*[header.index(name) for name in columns])
+        for row in reader:
+            if not row:
+                continue # skip blank lines
+            if len(row) < len(header):
+                row += [""] * (len(header) - len(row)) # pad short rows
+            yield pick(row)
+
+
+
 def load_addresses(file_path):
     """Load addresses from compiled address file
         Columns in file: 
@@ -176,14 +248,11 @@ def load_addresses(file_path):
             3. Map Link - need to add in calendar as Google map link
     """
     addresses = {}
-    with open(file_path, newline="", encoding="utf-8") as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            school_name = row["School Name"].strip()
-            addresses[school_name] = {
-                "address": row["Address"].strip(),
-                "map_link": row["Map Link"].strip()
-            }
+    for school_name, address, map_link in read_csv_columns(file_path, ("School Name", "Address", "Map Link")):
+        addresses[school_name.strip()] = {
+            "address": address.strip(),
+            "map_link": map_link.strip()
+        }
     return addresses
 
 
@@ -200,17 +269,14 @@ def load_referees(file_path):
         7. Courriel - need to add in calendar
     """
     referees = {}
-    with open(file_path, newline="", encoding="utf-8") as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            ref_id = row["Numéro"].strip()
-            ref_name = f"{row['Nom'].strip()} {row['Prénom'].strip()}"
-            referees[ref_id] = {
-                "Nom": ref_name,
-                "Téléphone 1": row["Téléphone 1"].strip(),
-                "Téléphone 2": row["Téléphone 2"].strip(),
-                "Courriel": row["Courriel"].strip()
-            }
+    columns = ("Numéro", "Nom", "Prénom", "Téléphone 1", "Téléphone 2", "Courriel")
+    for ref_id, nom, prenom, telephone_1, telephone_2, courriel in read_csv_columns(file_path, columns):
+        referees[ref_id.strip()] = {
+            "Nom": f"{nom.strip()} {prenom.strip()}",
+            "Téléphone 1": telephone_1.strip(),
+            "Téléphone 2": telephone_2.strip(),
+            "Courriel": courriel.strip()
+        }
     return referees
 
 
@@ -229,20 +295,17 @@ def load_matches(file_path):
         9. Autre arbitre  - needed as link to file 'referees'
         10. Accepté/Refusé  - not needed
         11. Match fait  - not needed
+
+    Returns a list of tuples holding the needed columns in MATCH_COLUMNS order.
     """
-    matches = []
-    with open(file_path, newline="", encoding="utf-8") as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            matches.append(row)
-    return matches
+    return list(read_csv_columns(file_path, MATCH_COLUMNS))
 
 
 
 def parse_datetime(date_str, time_str):
     """
     Convert the given date and time strings into a datetime object.
-    Tries several known formats used by browsers or exported HTML pages.
+    Detects which of the known formats (DATETIME_FORMATS) is used, trying them all only as a fallback.
 
     Parameters
     ----------
@@ -257,101 +320,133 @@ def parse_datetime(date_str, time_str):
         Combined datetime object
     """
 
-    possible_formats = [
-        "%Y-%m-%d %H:%M",
-        "%d/%m/%Y %H:%M",
-        "%d-%m-%Y %H:%M",
-        "%Y/%m/%d %H:%M",
-        "%d.%m.%Y %H:%M",
-    ]
+    datetime_str = f"{date_str} {time_str}"
 
-    for fmt in possible_formats:
+    # Pick the format from the shape of the date: length of the leading number and first separator
+    leading_digits = len(datetime_str) - len(datetime_str.lstrip("0123456789"))
+    separator = datetime_str[leading_digits:leading_digits + 1]
+    fmt = DATETIME_FORMATS.get((separator, leading_digits == 4))
+    if fmt:
         try:
-            return datetime.strptime(f"{date_str} {time_str}", fmt)
+            return datetime.strptime(datetime_str, fmt)
         except ValueError:
             pass
 
-    raise ValueError(f"Unrecognized date/time format: '{date_str} {time_str}'")
+    # Unusual input (e.g. padded with spaces): fall back to trying every known format
+    for fmt in DATETIME_FORMATS.values():
+        try:
+            return datetime.strptime(datetime_str, fmt)
+        except ValueError:
+            pass
+
+    raise ValueError(f"Unrecognized date/time format: '{datetime_str}'")
+
+
+
+def prepare_addresses(addresses_dict):
+    """
+    Normalize every school name once so that terrains can be matched against them
+    without re-normalizing the whole address book for each match.
+
+    Returns a list of (norm_school, school_words, address, map_link) tuples,
+    in the same order as addresses_dict.
+    """
+    norm_addresses = []
+    for school_name, row in addresses_dict.items():
+        norm_school = normalize(school_name)
+        norm_addresses.append((norm_school, set(norm_school.split()), row["address"], row["map_link"]))
+    return norm_addresses
 
 
 
-def overlap_score(a, b):
+def build_word_index(norm_addresses):
     """
-    Returns value between 0 and 1 based on shared words.
+    Build an inverted index {word: set of positions in norm_addresses} so that a terrain
+    is only scored against the schools that share at least one word with it.
     """
-    set_a = set(a.split())
-    set_b = set(b.split())
-    if not set_a or not set_b:
-        return 0
-    overlap = len(set_a & set_b)
-    total = max(len(set_a), len(set_b))
-    # print(f"set_a = {set_a}; set_b = {set_b}; overlap = {overlap}; total = {total}")
-    return overlap / total
+    word_index = defaultdict(set)
+    for i, (norm_school, school_words, address, map_link) in enumerate(norm_addresses):
+        for word in school_words:
+            word_index[word].add(i)
+    return word_index
 
 
 
 
-def find_address_for_terrain(terrain, addresses_dict):
+def find_address_for_terrain(terrain, norm_addresses, word_index):
     """
     Try to return best address + map link for a given terrain name.
     Uses normalization and partial substring match.
+    norm_addresses and word_index come from prepare_addresses() and build_word_index().
     """
 
     if not terrain:
         return None, None
 
     norm_terrain = normalize(terrain)
+    terrain_words = set(norm_terrain.split())
     # print(f"terrain = {terrain}; Normalised terrain: {norm_terrain}")
+
+    # 1) common case: direct substring either direction, cheap check on every school
+    for norm_school, school_words, address, map_link in norm_addresses:
+        if norm_terrain in norm_school or norm_school in norm_terrain:
+            return address, map_link
+
+    # 2) otherwise score only the schools sharing words with the terrain:
+    # number of shared words per school, counted straight from the index
+    overlaps = Counter(chain.from_iterable(word_index.get(word, ()) for word in terrain_words))
     best_score = 0
     best_entry = None
-    
-    for school_name, row in addresses_dict.items():
-        norm_school = normalize(school_name)
-        
 
-        # direct substring either direction
-        if norm_terrain in norm_school or norm_school in norm_terrain:
-            return row["address"], row["map_link"]
+    for i in sorted(overlaps): # same order as norm_addresses so ties keep the first school
+        norm_school, school_words, address, map_link = norm_addresses[i]
 
-        # compute simple overlap score
-        score = overlap_score(norm_terrain, norm_school)
+        # simple overlap score: value between 0 and 1 based on shared words
+        score = overlaps[i] / max(len(terrain_words), len(school_words))
         # print(f"Normalised school name: {norm_school}; score = {score}")
         if score > best_score:
             best_score = score
-            best_entry = row
+            best_entry = (address, map_link)
 
     # pick match only if similarity high enough
     if best_score > 0.45:  # tweakable threshold
-        return best_entry["address"], best_entry["map_link"]
+        return best_entry
 
     return None, None
 
 
 
 
-def create_calendar(matches, addresses, referees):
+def find_addresses_for_terrains(terrains, addresses):
     """
-    Read match data from various csv files (matches, addresses, and referees) and generate a calendar event
+    Look up the address + map link of every terrain in one batch: the address book is
+    normalized and indexed once, then each distinct terrain is matched against it.
+    Returns a list of (address, map_link) pairs aligned with terrains.
+    """
+    norm_addresses = prepare_addresses(addresses)
+    word_index = build_word_index(norm_addresses)
+
+    # A team plays at the same school again and again: search each distinct terrain only once
+    terrain_cache = {}
+    for terrain in terrains:
+        if terrain not in terrain_cache:
+            terrain_cache[terrain] = find_address_for_terrain(terrain, norm_addresses, word_index)
+    return [terrain_cache[terrain] for terrain in terrains]
+
+
+
+
+def build_events(matches, locations, referees):
+    """
+    Build the calendar event of each match (matches without date or time are skipped).
+    locations holds the (address, map_link) of each match, in the same order as matches.
+    Returns the VEVENT blocks (.ics text) of the events.
     """
-    calendar = Calendar()
-
-    # open csv and extract details needed for calendar
-    for row in matches:
-
-        # Extract required fields
-        ligue = row["Ligue"]
-        calibre = row["Calibre"]
-        jour = row["Jour"]
-        date = row["Date"]
-        heure = row["Heure"]
-        equipes = row["Equipes"]
-        school_name = row["Terrain"]
-        referee_id = row["Autre arbitre"]
-
-        # address_info = addresses.get(school_name, {"address": "Unknown", "map_link": ""}) # Lookup the school's address
-        # address = address_info["address"]
-        # map_link = address_info["map_link"]
-        address, map_link = find_address_for_terrain(school_name, addresses)  # Lookup the school's address
+    events = []
+    stamp = datetime.now(timezone.utc).strftime(ICS_DATETIME_FORMAT) # when the events were created
+
+    # Each match holds the required fields in MATCH_COLUMNS order
+    for (ligue, calibre, jour, date, heure, equipes, school_name, referee_id), (address, map_link) in zip(matches, locations):
 
         referee_name = referees.get(referee_id, "Unknown") # Lookup the referee's details
 
@@ -376,18 +471,64 @@ def create_calendar(matches, addresses, referees):
                 f"\nGoogle Maps Link:\n{map_link}\n"
             )
 
-            # Build calendar event
-            event = Event()
-            event.name = title
-            event.begin = dt_start
-            event.end = dt_end
-            event.location = event.location = f"{school_name} - {address}\nGoogle Maps: {map_link}"
-            event.description = description
+            # Build calendar event (times in UTC, text values escaped)
+            event = VEVENT_TEMPLATE.format(
+                uid=f"{uuid.uuid4()}@{DOMAIN}",
+                stamp=stamp,
+                start=dt_start.astimezone(timezone.utc).strftime(ICS_DATETIME_FORMAT),
+                end=dt_end.astimezone(timezone.utc).strftime(ICS_DATETIME_FORMAT),
+                summary=title.translate(ICS_ESCAPE_MAP),
+                location=f"{school_name} - {address}\nGoogle Maps: {map_link}".translate(ICS_ESCAPE_MAP),
+                description=description.translate(ICS_ESCAPE_MAP),
+            )
 
-            # Add event to calendar
-            calendar.events.add(event)
-    
-    return calendar
+            # Add event to the list
+            events.append(event)
+
+    return events
+
+
+
+def create_calendar(matches, addresses, referees):
+    """
+    Read match data from various csv files (matches, addresses, and referees) and generate a calendar event
+    Returns the list of events (VEVENT blocks) to write with write_calendar().
+    """
+    # Lookup the address of every match's school in one batch, before building the events
+    terrain_pos = MATCH_COLUMNS.index("Terrain")
+    locations = find_addresses_for_terrains([match[terrain_pos] for match in matches], addresses)
+
+    return build_events(matches, locations, referees)
+
+
+
+def write_calendar(events, ics_file):
+    """Write the events (VEVENT blocks) between the calendar header and footer into ics_file."""
+    # newline="" keeps the \r\n line endings required by iCalendar unchanged on every OS
+    with open(ics_file, "w", encoding="utf-8", newline="") as f:
+        f.write(ICS_HEADER)
+        f.writelines(events) # one event at a time
+        f.write(ICS_FOOTER)
+
+
+
+def csv_is_outdated(html_file, csv_file):
+    """
+    Return True when csv_file has to be (re)generated from html_file:
+    the CSV does not exist yet or the HTML page was saved after it.
+    """
+    if not os.path.exists(csv_file):
+        return True
+    return os.path.exists(html_file) and os.path.getmtime(html_file) > os.path.getmtime(csv_file)
+
+
+
+def extract_if_outdated(html_file, csv_file, column_mapping):
+    """Run load_html only when the HTML page changed since its CSV was written."""
+    if csv_is_outdated(html_file, csv_file):
+        load_html(html_file, csv_file, column_mapping, verbose=True)
+    else:
+        print(f"'{csv_file}' is up to date with '{html_file}', skipping extraction.")
 
 
 
@@ -396,17 +537,21 @@ def create_calendar(matches, addresses, referees):
 # -----------------------------
 def main():
     
+    # Load the three pages at the same time and save html responses
+    load_and_import_pages(COOKIES, DOMAIN, [
+        (URL_MATCHES, HTML_MATCHES),        # page "Mes assignations" which contains match details
+        (URL_ADDRESSES, HTML_ADDRESSES),    # page "Plans de route" which contains location match details
+        (URL_REFEREES, HTML_REFEREES),      # page "Bottin téléphonique" which contains referees details
+    ])
+
     # Retrieve match details
-    load_and_import_data(COOKIES, DOMAIN, URL_MATCHES, HTML_MATCHES) # load page "Mes assignations" which contains match details and save html response
-    load_html(HTML_MATCHES, MATCHES_CSV, COLUMN_MAP_ASSIGNATIONS) # from html response, retrieve only necessary data and store them in a csv file
+    extract_if_outdated(HTML_MATCHES, MATCHES_CSV, COLUMN_MAP_ASSIGNATIONS) # from html response, retrieve only necessary data and store them in a csv file (if page changed)
 
     # Retrieve addresses
-    load_and_import_data(COOKIES, DOMAIN, URL_ADDRESSES, HTML_ADDRESSES) # load page "Plans de route" which contains location match details and save html response
-    load_html(HTML_ADDRESSES, ADDRESSES_CSV, COLUMN_MAP_ADDRESSES) # from html response, retrieve only necessary data and store them in a csv file
+    extract_if_outdated(HTML_ADDRESSES, ADDRESSES_CSV, COLUMN_MAP_ADDRESSES) # from html response, retrieve only necessary data and store them in a csv file (if page changed)
 
     # Retrieve referees details
-    load_and_import_data(COOKIES, DOMAIN, URL_REFEREES, HTML_REFEREES) # load page "Bottin téléphonique" which contains referees details and save html response
-    load_html(HTML_REFEREES, REFEREES_CSV, COLUMN_MAP_REFEREE) # from html response, retrieve only necessary data and store them in a csv file
+    extract_if_outdated(HTML_REFEREES, REFEREES_CSV, COLUMN_MAP_REFEREE) # from html response, retrieve only necessary data and store them in a csv file (if page changed)
 
     # Load match, location and referee details from csv files into dictionaries 
     files_to_check = {MATCHES_CSV, ADDRESSES_CSV, REFEREES_CSV}
@@ -422,11 +567,10 @@ def main():
     referees = load_referees(REFEREES_CSV)
 
     # Create calendar events based on the dictionaries created
-    cal = create_calendar(matches, addresses, referees)
+    events = create_calendar(matches, addresses, referees)
 
     # Combine all calendar events to a calendar file (.ics file)
-    with open(ICS_FILE, "w", encoding="utf-8") as f:
-        f.writelines(cal.serialize())
+    write_calendar(events, ICS_FILE)
     print(f"\nSUCCESS: Calendar file '{ICS_FILE}' created successfully!")
     
 
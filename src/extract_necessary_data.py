@@ -13,15 +13,28 @@ OUTPUT:
 # ------------------------------
 # IMPORTS
 # ------------------------------
-from bs4 import BeautifulSoup       # THIRD-PARTY: Parse and navigate HTML content
+from bs4 import BeautifulSoup, SoupStrainer  # THIRD-PARTY: Parse and navigate HTML content
 import csv                          # STANDARD: Read/write CSV files
-import os                           # STANDARD: File existence checks
+import os                           # STANDARD: Environment variables (DEBUG_ROWS), replace/remove files
+from pathlib import Path            # STANDARD: Read whole files in one call
 from typing import List             # STANDARD: Type hints for better readability
+from functools import lru_cache     # STANDARD: Reuse the column layout computed for a column mapping
+import importlib.util               # STANDARD: Check if an optional package is installed
 
 # ------------------------------
 # CONSTANTS
 # ------------------------------
+HIDDEN_TAGS = ('input', 'script', 'style') # elements whose text is not visible in a table cell
 
+# Parser used by BeautifulSoup: C-based 'lxml' (much faster) when installed,
+# otherwise the pure-Python 'html.parser' that always ships with Python
+HTML_PARSER = 'lxml' if importlib.util.find_spec('lxml') else 'html.parser'
+
+# Only table rows (with everything inside them: cells, inputs, links) are read from the pages,
+# so BeautifulSoup does not need to build the rest of the document
+ROWS_ONLY = SoupStrainer('tr')
+
+CSV_BUFFER_SIZE = 1024 * 1024 # 1 MB write buffer for the CSV (instead of the default 8 KB): fewer write calls
 
 
 # ------------------------------
@@ -29,148 +42,167 @@ from typing import List             # STANDARD: Type hints for better readabilit
 # -----------------------------
 def _td_text_safe(cols: List, idx: int) -> str:
     """Return trimmed visible text of cols[idx] or empty string if index missing."""
-    try:
-        td = cols[idx]
-        td_copy = td.__copy__() # Make a shallow copy so we do NOT mutate the original BeautifulSoup tree
-
-        # Remove non-visible elements (hidden inputs, scripts, styles)
-        for tag in td_copy.find_all(['input', 'script', 'style']):
-            tag.decompose()
-
-        return td_copy.get_text(strip=True)
-    except Exception:
+    if idx >= len(cols):
         return ""
 
+    # Keep only visible text: skip strings inside hidden inputs, scripts and styles
+    # (filtering while reading avoids copying the cell and leaves the BeautifulSoup tree untouched)
+    return "".join(
+        text.strip() for text in cols[idx].strings
+        if text.parent.name not in HIDDEN_TAGS and text.strip()
+    )
+
 
 
 def _td_link_safe(cols: List, idx: int) -> str:
     """Return the first <a href=""> link in this <td>, or empty string."""
-    try:
-        td = cols[idx]
-        a = td.find("a", href=True)
-        return a["href"].strip() if a else ""
-    except Exception:
+    if idx >= len(cols):
         return ""
+    a = cols[idx].find("a", href=True)
+    return a["href"].strip() if a else ""
+
+
+
+@lru_cache(maxsize=None)
+def _compile_mapping(mapping_items: tuple) -> tuple:
+    """
+    Return (headers, column_extractors, accepted_pos, match_done_pos) for the column mapping given as a tuple
+    of (column_name, td_index) items: the CSV header, for each column the td index and the helper that reads it
+    (link columns keep the href), and the positions of the 'Accepté/Refusé' and 'Match fait' columns (None if absent).
+    Cached, since the same few column mappings are used for every page.
+    """
+    headers = tuple(col_name for col_name, _ in mapping_items)
+    column_extractors = tuple(
+        (idx, _td_link_safe if ("lien" in col_name.lower() or "link" in col_name.lower()) else _td_text_safe)
+        for col_name, idx in mapping_items
+    )
+    accepted_pos = headers.index('Accepté/Refusé') if 'Accepté/Refusé' in headers else None
+    match_done_pos = headers.index('Match fait') if 'Match fait' in headers else None
+    return headers, column_extractors, accepted_pos, match_done_pos
     
 
 # ------------------------------
 # Functions
 # -----------------------------
-def load_html(html_file, csv_file, column_mapping):
+def load_html(html_file, csv_file, column_mapping, verbose=False):
     """
     Load HTML file and extract table data based on column mapping.
     
     html_file: str -> path to HTML file
     csv_file: str -> path to output CSV
     column_mapping: dict -> {column_name: td_index_in_row}
+    verbose: bool -> print the number of rows found and written
     
     Notes:
     - Automatically handles pages with or without checkboxes/radios.
     - Special columns like 'Accepte/Refuse' or 'Match fait' are handled only if present.
     """
 
-    # Check if HTML file exists
-    if not os.path.exists(html_file):
+    # Load HTML file (a missing file is reported by the read itself, no separate existence check)
+    try:
+        html_bytes = Path(html_file).read_bytes()
+    except FileNotFoundError:
         print(f"ERROR: '{html_file}' not found in the current directory.")
         return
-    
-    # Load HTML file
-    with open(html_file, 'r', encoding='utf-8') as file:
-        html_content = BeautifulSoup(file, 'html.parser')
+
+    # Raw bytes are decoded by the parser itself; pages are always saved as UTF-8 by import_data,
+    # whatever <meta charset> they declare, so the encoding is given instead of guessed
+    html_content = BeautifulSoup(html_bytes, HTML_PARSER, parse_only=ROWS_ONLY, from_encoding='utf-8')
 
     # Find all table rows represented by <tr> tag in HTML file
     rows = html_content.find_all('tr')
-    print(f"Number of records found on page: {len(rows)}")
-
-    # DEBUG : write ALL <tr> rows exactly as BeautifulSoup sees them
-    with open("debug_rows.html", "w", encoding="utf-8") as dbg:
-        for i, r in enumerate(rows):
-            dbg.write(f"\n\n==== ROW {i} START ====\n")
-            dbg.write(str(r))
-            dbg.write(f"\n==== ROW {i} END ====\n")
-
-
-    extracted = [] # This list will hold all the extracted match data
-
-    # Loop through each row in the table
-    for row in rows:
-        cols = row.find_all('td') # Find all <td> elements in the row (table cells)
-        if not cols:
-            continue # skip empty rows or non-table rows
-
-        row_data = {}
-
-        # Extract columns based on mapping
-        for col_name, idx in column_mapping.items():
-            if "lien" in col_name.lower() or "link" in col_name.lower():
-                row_data[col_name] = _td_link_safe(cols, idx)
-            else:
-                row_data[col_name] = _td_text_safe(cols, idx)
-        # print(f"row_data = {row_data}")
-
-        # ------------------ Section only for page 'Mes Assignations': BEGIN --------------------------------
-        # Go through row and check if radio buttons or checkboxes exists
-        radio_buttons = row.find_all('input', {'type': 'radio'}) # Check if row contains radio buttons
-        checkboxes = row.find_all('input', {'type': 'checkbox'}) # Check if row contains checkbox
-        if radio_buttons or checkboxes:
-
-            if radio_buttons:
-                # If radio buttons exist, find the checked one
-                for radio in radio_buttons:
-                    radio_button_name = radio.attrs.get('name', '')
-                    if 'isgameaccepted' in radio_button_name and 'checked' in radio.attrs:
-                        value = radio.attrs.get('value')
-                        if value == '1':
-                            row_data['Accepté/Refusé'] = 'Accepté'
-                        elif value == '2':
-                            row_data['Accepté/Refusé'] = 'Refusé'
-                        # print(f"..................radio_button_name = {radio_button_name};row_data = {row_data}")
+    if verbose:
+        print(f"Number of records found on page: {len(rows)}")
+
+    # DEBUG : write ALL <tr> rows exactly as BeautifulSoup sees them (only when DEBUG_ROWS is set,
+    # e.g. `DEBUG_ROWS=1 python src/create_calendar.py`, since re-serializing every row is expensive)
+    if os.environ.get("DEBUG_ROWS"):
+        with open("debug_rows.html", "w", encoding="utf-8") as dbg:
+            dbg.write("".join(
+                f"\n\n==== ROW {i} START ====\n{r}\n==== ROW {i} END ====\n" for i, r in enumerate(rows)
+            ))
+
+
+    # Same for every row: CSV header, which helper reads each column and where the special columns are
+    headers, column_extractors, accepted_pos, match_done_pos = _compile_mapping(tuple(column_mapping.items()))
+
+    # Radio buttons / checkboxes of the whole page, found in one search and grouped by the row holding them
+    inputs_by_row = {} # id(<tr>) -> list of <input> tags
+    for inp in html_content.find_all('input'):
+        tr = inp.find_parent('tr')
+        if tr is not None:
+            inputs_by_row.setdefault(id(tr), []).append(inp)
+
+    # Write each row to the CSV as soon as it is extracted (no list of all rows kept in memory).
+    # Rows go to a temporary file that replaces csv_file only once every row is written: an interrupted
+    # extraction must not leave a partial CSV newer than the HTML, which csv_is_outdated() would then keep
+    tmp_file = csv_file + ".tmp"
+    count = 0 # number of rows written
+    try:
+        with open(tmp_file, 'w', newline='', encoding='utf-8', buffering=CSV_BUFFER_SIZE) as f:
+            writer = csv.writer(f)
+            writer.writerow(headers) # Write header
+
+            # Loop through each row in the table
+            for row in rows:
+                # Table cells are the direct <td> children of the row (no search through the whole row);
+                # fall back to a full search when the cells are wrapped in another tag, e.g. <tr><form><td>
+                cols = [child for child in row.children if getattr(child, 'name', None) == 'td'] or row.find_all('td')
+                if not cols:
+                    continue # skip empty rows or non-table rows
+
+                # Extract columns based on mapping, already in header order
+                values = [extract(cols, idx) for idx, extract in column_extractors]
+
+                # ------------------ Section only for page 'Mes Assignations': BEGIN --------------------------------
+                # Go through row and check if radio buttons or checkboxes exists
+                inputs = inputs_by_row.get(id(row), ())
+                radio_buttons = [tag for tag in inputs if tag.get('type') == 'radio'] # Check if row contains radio buttons
+                checkboxes = [tag for tag in inputs if tag.get('type') == 'checkbox'] # Check if row contains checkbox
+                if radio_buttons or checkboxes:
+
+                    if radio_buttons and accepted_pos is not None:
+                        # If radio buttons exist, find the checked one
+                        for radio in radio_buttons:
+                            attrs = radio.attrs # plain dict of the tag attributes, looked up once
+                            radio_button_name = attrs.get('name', '')
+                            if 'isgameaccepted' in radio_button_name and 'checked' in attrs:
+                                value = attrs.get('value')
+                                if value == '1':
+                                    values[accepted_pos] = 'Accepté'
+                                elif value == '2':
+                                    values[accepted_pos] = 'Refusé'
 
             
-            checkbox_value = ""
-            match_done = "no"
-            if checkboxes:
-                for checkbox in checkboxes:
-                    checkbox_name = checkbox.attrs.get('name', '')
-                    # print(f"..................checkbox_name = {checkbox_name}")
-                    if 'isgamedone' in checkbox_name and not 'isgamedonealone' in checkbox_name:
-                        checkbox_value = checkbox.attrs.get('value', '')
-                        # print(f"..................checkbox_value = {checkbox_value}")
-                        if checkbox.has_attr('checked'):
-                            match_done = "yes"
-                            row_data['Match fait'] = match_done
-                    row_data['Match fait'] = match_done
-                    # print(f"..................match_done = {match_done}")
-
-            # print(f"row_data = {row_data}")
-            # --- FILTER CONDITION : only include rows to data list where match is accepted AND not done yet
-            match_accepted_or_refused = list(row_data.values())[9] # said if match has been accepted or refused
-            match_completed = list(row_data.values())[10] # said if match has been played or not
-            # print(f"........XXXXXX..........match_accepted_or_refused = {match_accepted_or_refused}; match_completed = {match_completed}; row_data.values() = {row_data.values()}")
-            if match_accepted_or_refused == 'Accepté' and match_completed == 'no':
-            # if  accepte_refuse == 'Accepté' and match_done_checked == 'no' :
-                extracted.append(row_data)
+                    match_done = "no"
+                    if checkboxes and match_done_pos is not None:
+                        for checkbox in checkboxes:
+                            attrs = checkbox.attrs
+                            checkbox_name = attrs.get('name', '')
+                            if 'isgamedone' in checkbox_name and not 'isgamedonealone' in checkbox_name:
+                                if 'checked' in attrs:
+                                    match_done = "yes"
+                            values[match_done_pos] = match_done
+
+                    # --- FILTER CONDITION : only include rows to data list where match is accepted AND not done yet
+                    # (each condition only applies when the page has that column)
+                    match_accepted = accepted_pos is None or values[accepted_pos] == 'Accepté' # said if match has been accepted or refused
+                    match_not_completed = match_done_pos is None or values[match_done_pos] == 'no' # said if match has been played or not
+                    if match_accepted and match_not_completed:
+                        writer.writerow(values)
+                        count += 1
             
-            # ------------------ Section only for page 'Mes Assignations': END ----------------------------------
-
-        else:
-            # still append data even if there is no radio buttons and no checkboxes present in table 
-            extracted.append(row_data)
-    
-    
-    # print(f"HERE=========================================")
-    # print(f"extracted: {extracted}")
-
-
-    # Once looped through table and data extracted, save result to CSV
-    with open(csv_file, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        headers = list(column_mapping.keys())
-        writer.writerow(headers) # Write header
-        for row in extracted:
-            writer.writerow([row.get(h, "") for h in headers])  # Write values in header order
-    print(f"Extraction complete: {len(extracted)} rows written to '{csv_file}'.")
-
-
-    
-
+                    # ------------------ Section only for page 'Mes Assignations': END ----------------------------------
+
+                else:
+                    # still write data even if there is no radio buttons and no checkboxes present in table 
+                    writer.writerow(values)
+                    count += 1
+        os.replace(tmp_file, csv_file)
+    except BaseException:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+
+    if verbose:
+        print(f"Extraction complete: {count} rows written to '{csv_file}'.")
@@ -1,7 +1,7 @@
 """
 This script loads exported cookies from a web browser, 
-uses them to fetch a protected basketball page,
-and stores the HTTP response.
+uses them to fetch protected basketball pages,
+and stores the HTTP responses.
 
 INPUT:
     - cookies: obtained from website once user has logged in and pasted in json file
@@ -18,13 +18,21 @@ OUTPUT:
 # IMPORTS
 # ------------------------------
 import json         # STANDARD: Read and parse JSON files (cookies.json)
+import re           # STANDARD: Regular expressions (login page detection)
 import os           # STANDARD: File paths, existence checks, OS interaction
 import requests     # THIRD-PARTY: Send HTTP requests (GET/POST) to websites
 import datetime     # STANDARD: Handle dates and times (cookie expiration)
+from pathlib import Path    # STANDARD: Read whole files in one call
+from concurrent.futures import ThreadPoolExecutor   # STANDARD: Fetch several pages at the same time
 
 # ------------------------------
 # CONSTANTS
 # ------------------------------
+SESSION = requests.Session() # shared HTTP session: keeps the connection to the website alive between page fetches
+VALIDATORS_SUFFIX = ".headers.json" # saved next to each html file: ETag / Last-Modified of the last response
+
+# Words that normally appear on the login page, searched all at once and regardless of case
+LOGIN_KEYWORDS_RE = re.compile(r"se connecter|mot de passe|identifiant", re.IGNORECASE)
 
 
 # ------------------------------
@@ -43,8 +51,7 @@ def load_cookies(cookies_json, domain):
 
     # Try to open and parse the JSON file
     try:
-        with open(cookies_json, "r", encoding="utf-8") as f:
-            raw = json.load(f)
+        raw = json.loads(Path(cookies_json).read_bytes()) # small file: read at once, json detects the encoding
 
     except json.JSONDecodeError as e:
         print(f"ERROR: Failed to read '{cookies_json}'. The file is not valid JSON.")
@@ -83,11 +90,43 @@ def load_cookies(cookies_json, domain):
 
 
 
-def fetch_page(cookies, url):
-    """Request the basketball page using the provided cookies."""
+def conditional_headers(html_file):
+    """
+    Build the If-None-Match / If-Modified-Since headers from the validators saved with html_file,
+    so that the website can answer 304 Not Modified instead of sending the same page again.
+    Returns an empty dict when there is no previous response to compare with.
+    """
+    if not os.path.exists(html_file):
+        return {}
+    try:
+        with open(html_file + VALIDATORS_SUFFIX, "r", encoding="utf-8") as f:
+            validators = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    headers = {}
+    if validators.get("ETag"):
+        headers["If-None-Match"] = validators["ETag"]
+    if validators.get("Last-Modified"):
+        headers["If-Modified-Since"] = validators["Last-Modified"]
+    return headers
+
+
+
+def save_validators(response, html_file):
+    """Save the ETag / Last-Modified headers of the response next to html_file (if the website sent any)."""
+    validators = {name: response.headers[name] for name in ("ETag", "Last-Modified") if name in response.headers}
+    if validators:
+        with open(html_file + VALIDATORS_SUFFIX, "w", encoding="utf-8") as f:
+            json.dump(validators, f)
+
+
+
+def fetch_page(cookies, url, headers=None):
+    """Request the basketball page using the provided cookies (and optional extra headers)."""
     print("Fetching page...")
     try:
-        resp = requests.get(url, cookies=cookies, timeout=10)
+        resp = SESSION.get(url, cookies=cookies, headers=headers, timeout=10)
         print("Status code:", resp.status_code) # Print the HTTP status code (e.g., 200, 404, 500)
         return resp
     except Exception as e:
@@ -98,27 +137,24 @@ def fetch_page(cookies, url):
 
 def cookies_are_valid(html):
     """Check if the returned HTML contains the login page."""
-    html_lower = html.lower()   # convert the entire HTML to lowercase
-    login_keywords = ["se connecter", "mot de passe", "identifiant"] #list of words that normally appear on the login page
-    found_login_keyword = False # assume cookies are valid unless we find a login keyword
-
-    # look for each keyword in the HTML
-    for word in login_keywords:
-        if word.lower() in html_lower:
-            found_login_keyword = True # If any word is found, cookies are invalid
-            # print(f"keyword: {word.lower()}; found: found_login_keyword")
-            break  # No need to continue checking
-
-    # If login keywords were found → cookies invalid → return False
-    if found_login_keyword:
-        return False
-    else:
-        return True
+    # One scan of the HTML (no lowercase copy of the whole page), stopping at the first login keyword found.
+    # If any login keyword is found → cookies invalid → return False
+    return LOGIN_KEYWORDS_RE.search(html) is None
 
-def load_and_import_data(cookies, domain, url, html_file):
-    
-    cookies = load_cookies(cookies, domain)
-    response = fetch_page(cookies, url)
+
+
+def save_and_check_response(response, html_file):
+    """
+    Save the page response to html_file and stop if it is the login page (cookies expired).
+    A 304 Not Modified response keeps the html_file saved by a previous run untouched.
+    """
+    if response.status_code == 304:
+        print(f"Page not modified since last run, keeping '{html_file}'")
+        return
+
+    # validators saved with the previous page no longer describe html_file once it is overwritten
+    if os.path.exists(html_file + VALIDATORS_SUFFIX):
+        os.remove(html_file + VALIDATORS_SUFFIX)
 
     with open(html_file, "w", encoding="utf-8") as f:
         f.write(response.text)
@@ -126,8 +162,24 @@ def load_and_import_data(cookies, domain, url, html_file):
 
     if cookies_are_valid(response.text):
         print("SUCCESS: Cookies are valid! You are logged in.")
+        save_validators(response, html_file) # only for real pages, never for the login page
     else:
         print("ERROR: Cookies expired or invalid - export new cookies.json from browser")
         exit(1)
 
 
+
+def load_and_import_pages(cookies, domain, pages):
+    """
+    Load the cookies once, fetch the pages concurrently (one thread per page) over the shared session,
+    then save each page response and check that the cookies were still valid.
+
+    pages: list of (url, html_file) tuples
+    """
+    cookies = load_cookies(cookies, domain)
+
+    with ThreadPoolExecutor(max_workers=len(pages)) as executor:
+        responses = list(executor.map(lambda page: fetch_page(cookies, page[0], conditional_headers(page[1])), pages))
+
+    for (url, html_file), response in zip(pages, responses):
+        save_and_check_response(response, html_file)